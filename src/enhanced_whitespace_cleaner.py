@@ -1,15 +1,193 @@
 import sys
 import re
 import os
+import mmap
+import math
+import functools
+import heapq
 import unicodedata
-from collections import Counter
+from collections import Counter, deque
+from operator import itemgetter
+from typing import NamedTuple
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTextEdit, QPushButton, QCheckBox, QLabel, QComboBox, QMessageBox,
     QFileDialog, QLineEdit, QStatusBar, QProgressBar
 )
 from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+try:
+    import numpy as np  # Optional: vectorized character counting on large texts
+except ImportError:
+    np = None
+
+# Invisible Unicode (watermark suspects): ZWSP, ZWNJ, ZWJ, NNBSP, NBSP, WJ, ZWNBSP, Em/En Dash
+_INVISIBLE_CHARS = '\u200B\u200C\u200D\u202F\u00A0\u2060\uFEFF\u2014\u2013'
+
+# Pre-compiled patterns for the scan hot path
+_BREAK_RE = re.compile(r'\s')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Characters per scan chunk; chunks end on whitespace so no word is split
+_SCAN_CHUNK = 1 << 20
+
+# Above this many characters, word entropy is estimated from start/middle/end windows
+_ENTROPY_SAMPLE_THRESHOLD = 4 << 20
+_ENTROPY_WINDOW = 32 << 10
+
+# Word separators for ASCII text in the entropy heuristic (matches \W on ASCII)
+_NONWORD_TO_SPACE = {c: ord(' ') for c in range(128) if not chr(c).isalnum() and chr(c) != '_'}
+
+# Separators QTextDocument.toRawText() keeps but toPlainText() turns into newlines:
+# paragraph separator, line separator (Shift+Enter), frame start/end markers
+_RAW_SEPARATORS = ('\u2029', '\u2028', '\uFDD0', '\uFDD1')
+
+# Clean steps kept for Undo/Redo; each entry is a full text snapshot
+_HISTORY_LIMIT = 20
+
+# Inputs with at least this many characters are cleaned on the thread pool
+_ASYNC_CLEAN_THRESHOLD = 1 << 20
+
+# Files at least this large are decoded straight from a memory map
+_MMAP_THRESHOLD = 16 << 20
+
+# Visible markers for invisible Unicode in detect_whitespace; matches are sparse,
+# so a character-class sub beats a per-character translate on non-ASCII text
+_DETECT_INVIS_MAP = {
+    '\u202F': '※',  # NNBSP
+    '\u200B': '◆', '\uFEFF': '◆', '\u200C': '◆', '\u200D': '◆', '\u00A0': '◆', '\u2060': '◆',  # Zero-width / no-break
+}
+_DETECT_INVIS_RE = re.compile('[' + ''.join(_DETECT_INVIS_MAP) + ']')
+
+# Invisible Unicode replaced with a plain space when cleaning
+_INVIS_RE = re.compile(f'[{_INVISIBLE_CHARS}]')
+
+def _read_text_file(file_name):
+    """Read a UTF-8 file, normalizing newlines like text-mode open()."""
+    with open(file_name, 'rb') as file:
+        if os.fstat(file.fileno()).st_size >= _MMAP_THRESHOLD:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, 'utf-8')  # Decodes from the mapping without an intermediate bytes copy
+        else:
+            text = file.read().decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def _words(text):
+    """Split text into lowercase words for the entropy heuristic."""
+    if text.isascii():
+        # translate has a C fast path only for ASCII input
+        return text.lower().translate(_NONWORD_TO_SPACE).split()
+    return _WORD_RE.findall(text.lower())
+
+def _sample_windows(text, size):
+    """Yield whitespace-aligned windows of about size chars from the start, middle and end of text."""
+    length = len(text)
+    for start in (0, (length - size) // 2, length - size):
+        if start:
+            match = _BREAK_RE.search(text, start)
+            start = match.start() if match else length
+        match = _BREAK_RE.search(text, start + size)
+        end = match.start() if match else length
+        yield text[start:end]
+
+def _count_chars(text, chars):
+    """Return {char: occurrences in text} for each of chars."""
+    if text.isascii():  # O(1) flag check; non-ASCII chars cannot occur
+        return {char: text.count(char) if char.isascii() else 0 for char in chars}
+    if np is None:
+        return {char: text.count(char) for char in chars}
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return {char: int(np.count_nonzero(codes == ord(char))) for char in chars}
+
+@functools.lru_cache(maxsize=64)
+def _whitespace_pattern(remove_spaces, tab_replacement, remove_newlines):
+    """Compile the active space/tab/newline rules into one alternation.
+    
+    Returns (pattern, replacements), where replacements[i] replaces group i + 1,
+    or None when no rule is active. tab_replacement is None to leave tabs alone.
+    """
+    rules = []
+    if remove_spaces:
+        rules.append((r'\s+', ' '))  # Subsumes the tab and newline rules
+    else:
+        if remove_newlines:
+            # Removed tabs must not keep newlines apart, so absorb them into the run
+            rules.append((r'\t*\n[\t\n]*' if tab_replacement == '' else r'\n+', '\n'))
+        if tab_replacement is not None:
+            rules.append((r'\t', tab_replacement))
+    if not rules:
+        return None
+    pattern = re.compile('|'.join(f'({source})' for source, _ in rules))
+    return pattern, tuple(replacement for _, replacement in rules)
+
+@functools.lru_cache(maxsize=32)
+def _user_pattern(source):
+    """Compile a user-entered regex, reusing the Pattern across clean clicks."""
+    return re.compile(source)
+
+class CleanOpts(NamedTuple):
+    remove_spaces: bool
+    remove_tabs: bool
+    replace_tabs: bool
+    tab_width: int
+    remove_newlines: bool
+    trim_lines: bool
+    remove_invisible: bool
+    custom_pattern: str
+    custom_replacement: str
+
+def _trim_lines(text):
+    return "\n".join(line.strip() for line in text.splitlines())
+
+def _strip_invisible(text):
+    if text.isascii():  # All watermark chars are non-ASCII
+        return text
+    return _INVIS_RE.sub(' ', text)
+
+@functools.lru_cache(maxsize=64)
+def _build_cleaner(opts):
+    """Build a cleaning function that applies only the steps enabled in opts.
+    
+    Raises re.error if opts.custom_pattern does not compile.
+    """
+    steps = []
+    
+    # Standard cleaning, fused into a single pass
+    if opts.remove_tabs:
+        tab_replacement = ""
+    elif opts.replace_tabs:
+        tab_replacement = " " * opts.tab_width
+    else:
+        tab_replacement = None
+    fused = _whitespace_pattern(opts.remove_spaces, tab_replacement, opts.remove_newlines)
+    if fused is not None:
+        pattern, replacements = fused
+        steps.append(functools.partial(pattern.sub, lambda m: replacements[m.lastindex - 1]))
+    
+    if opts.trim_lines:
+        steps.append(_trim_lines)
+    
+    # Invisible Unicode cleaning (watermarks)
+    if opts.remove_invisible:
+        steps.append(_strip_invisible)
+    
+    # Custom regex
+    if opts.custom_pattern:
+        steps.append(functools.partial(_user_pattern(opts.custom_pattern).sub, opts.custom_replacement))
+    
+    def clean(text):
+        for step in steps:
+            text = step(text)
+        return text
+    return clean
+
+@functools.lru_cache(maxsize=32)
+def _describe(char):
+    """Describe a character as 'char (U+XXXX: NAME)'."""
+    return f"{char} (U+{ord(char):04X}: {unicodedata.name(char, 'Unknown')})"
 
 class UnicodeHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
@@ -41,37 +219,111 @@ class UnicodeHighlighter(QSyntaxHighlighter):
                 start, end = match.start(), match.end()
                 self.setFormat(start, end - start, format)
 
-class WatermarkScanThread(QThread):
+class ScanSignals(QObject):
     finished = pyqtSignal(dict)
-    
-    def __init__(self, text):
+    progress = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+class WatermarkScanTask(QRunnable):
+    def __init__(self, text, signals):
         super().__init__()
         self.text = text
+        self.signals = signals
     
     def run(self):
-        # Scan for invisible Unicode chars (common AI watermarks)
-        invisible_chars = []
-        unicode_pattern = re.compile(r'[\u200B\u200C\u200D\u202F\u00A0\u2060\uFEFF\u2014\u2013]')  # ZWSP, ZWJ, NNBSP, NBSP, WJ, ZWNBSP, Em/En Dash
-        for match in unicode_pattern.finditer(self.text):
-            char = match.group()
-            name = unicodedata.name(char, "Unknown")
-            invisible_chars.append(f"{char} (U+{ord(char):04X}: {name})")
+        try:
+            stats = self._scan()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(stats)
+    
+    def _scan(self):
+        text = self.text
+        length = len(text)
+        invisible_counter = Counter()
+        word_counter = Counter()
+        sampled = length > _ENTROPY_SAMPLE_THRESHOLD
+        if sampled:
+            for window in _sample_windows(text, _ENTROPY_WINDOW):
+                word_counter.update(_words(window))
+        
+        # Scan in chunks so progress can be reported on large inputs
+        start = 0
+        while start < length:
+            end = min(start + _SCAN_CHUNK, length)
+            if end < length:
+                match = _BREAK_RE.search(text, end)
+                end = match.start() if match else length
+            chunk = text[start:end]
+            
+            # Invisible Unicode chars (common AI watermarks)
+            invisible_counter.update({char: count for char, count in _count_chars(chunk, _INVISIBLE_CHARS).items() if count})
+            # Word tallies for the statistical check
+            if not sampled:
+                word_counter.update(_words(chunk))
+            
+            start = end
+            self.signals.progress.emit(int(100 * end / length))
+        
+        details = [f"{_describe(char)} × {count}" for char, count in invisible_counter.most_common()]
         
         # Basic statistical check for token patterns (simplified AI likelihood)
-        words = re.findall(r'\b\w+\b', self.text.lower())
-        word_counter = Counter(words)
-        top_words = [word for word, count in word_counter.most_common(10)]
-        entropy = -sum((count / len(words)) * re.log2(count / len(words) + 1e-10) for count in word_counter.values()) if words else 0
+        top_words = [word for word, count in heapq.nlargest(10, word_counter.items(), key=itemgetter(1))]
+        # H = log2(N) - sum(c * log2(c)) / N, one log2 per distinct word
+        counts = list(word_counter.values())
+        total = sum(counts)
+        log2 = math.log2
+        entropy = log2(total) - sum(c * log2(c) for c in counts) / total if total else 0
         ai_likelihood = "High" if entropy < 4.5 else "Low"  # Rough heuristic: AI text often has lower entropy
+        if sampled:
+            ai_likelihood += " (estimated)"
         
         stats = {
-            'invisible_chars': len(invisible_chars),
-            'details': invisible_chars[:10],  # Limit to first 10
+            'invisible_chars': sum(invisible_counter.values()),
+            'details': details,  # One line per distinct char
             'word_entropy': entropy,
             'ai_likelihood': ai_likelihood,
             'top_words': top_words
         }
-        self.finished.emit(stats)
+        return stats
+
+class LoadSignals(QObject):
+    finished = pyqtSignal(str, str)  # file name, text
+    failed = pyqtSignal(str)
+
+class FileLoadTask(QRunnable):
+    def __init__(self, file_name, signals):
+        super().__init__()
+        self.file_name = file_name
+        self.signals = signals
+    
+    def run(self):
+        try:
+            text = _read_text_file(self.file_name)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.file_name, text)
+
+class CleanSignals(QObject):
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+class CleanTask(QRunnable):
+    def __init__(self, text, cleaner, signals):
+        super().__init__()
+        self.text = text
+        self.cleaner = cleaner
+        self.signals = signals
+    
+    def run(self):
+        try:
+            text = self.cleaner(self.text)
+        except Exception as e:  # e.g. a bad group reference in the custom replacement
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(text)
 
 class WhitespaceCleaner(QMainWindow):
     def __init__(self):
@@ -79,9 +331,22 @@ class WhitespaceCleaner(QMainWindow):
         self.setWindowTitle("Enhanced AI Whitespace & Watermark Cleaner")
         self.setGeometry(100, 100, 1200, 800)
         
-        # History for undo/redo
-        self.history = []
-        self.history_index = -1
+        # Bounded history for undo/redo of cleans
+        self.history = deque(maxlen=_HISTORY_LIMIT)
+        self.redo_history = deque(maxlen=_HISTORY_LIMIT)
+        self._clean_source = None  # Input text a running clean was started from
+        
+        # Debounce stats refresh so bursts of edits trigger a single recompute
+        self._stats_timer = QTimer(self)
+        self._stats_timer.setSingleShot(True)
+        self._stats_timer.setInterval(150)
+        self._stats_timer.timeout.connect(self._do_update_stats)
+        
+        # Scans, cleans and file loads run on the shared thread pool and report through long-lived signallers
+        self._pool = QThreadPool.globalInstance()
+        self._scan_signals = ScanSignals(self)
+        self._load_signals = LoadSignals(self)
+        self._clean_signals = CleanSignals(self)
         
         # Main widget and layout
         self.central_widget = QWidget()
@@ -104,7 +369,7 @@ class WhitespaceCleaner(QMainWindow):
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
         self.output_text.setPlaceholderText("Visible whitespace and watermarks will appear here...")
-        self.highlighter = UnicodeHighlighter(self.output_text.document())
+        self.highlighter = None  # Created on first detect_whitespace
         self.layout.addWidget(QLabel("Output with Visible Whitespace & Watermarks:"))
         self.layout.addWidget(self.output_text)
         
@@ -176,7 +441,7 @@ class WhitespaceCleaner(QMainWindow):
         self.clear_button = QPushButton("Clear")
         self.load_button.clicked.connect(self.load_file)
         self.save_button.clicked.connect(self.save_file)
-        self.detect_button.clicked.connect(self.detect_whitespace)
+        self.detect_button.clicked.connect(lambda: self.detect_whitespace())
         self.clean_button.clicked.connect(self.clean_whitespace)
         self.scan_button.clicked.connect(self.scan_watermarks)
         self.undo_button.clicked.connect(self.undo)
@@ -196,6 +461,13 @@ class WhitespaceCleaner(QMainWindow):
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         self.layout.addWidget(self.progress_bar)
+        self._scan_signals.progress.connect(self.progress_bar.setValue)
+        self._scan_signals.finished.connect(self.on_scan_finished)
+        self._scan_signals.failed.connect(self.on_scan_failed)
+        self._load_signals.finished.connect(self.on_load_finished)
+        self._load_signals.failed.connect(self.on_load_failed)
+        self._clean_signals.finished.connect(self.on_clean_finished)
+        self._clean_signals.failed.connect(self.on_clean_failed)
         
         # Keyboard shortcuts
         self.load_button.setShortcut("Ctrl+O")
@@ -219,27 +491,32 @@ class WhitespaceCleaner(QMainWindow):
             self.regex_replace.clear()
     
     def update_stats(self):
+        """Schedule a statistics refresh; restarting the timer cancels a pending one."""
+        self._stats_timer.start()
+        
+    def _do_update_stats(self):
         """Update basic whitespace statistics."""
-        text = self.input_text.toPlainText()
-        spaces = len(re.findall(r' ', text))
-        tabs = len(re.findall(r'\t', text))
-        newlines = len(re.findall(r'\n', text))
-        self.stats_label.setText(f"Spaces: {spaces} | Tabs: {tabs} | Newlines: {newlines} | Invisible Unicode: 0 | AI Likelihood: Low")
+        text = self._input_plain_text()
+        counts = _count_chars(text, ' \t\n' + _INVISIBLE_CHARS)
+        spaces = counts[' ']
+        tabs = counts['\t']
+        newlines = counts['\n']
+        invisible = sum(counts[char] for char in _INVISIBLE_CHARS)
+        self.stats_label.setText(f"Spaces: {spaces} | Tabs: {tabs} | Newlines: {newlines} | Invisible Unicode: {invisible} | AI Likelihood: Low")
         self.status_bar.showMessage("Statistics updated")
         
     def scan_watermarks(self):
         """Scan for watermarks and AI patterns."""
-        text = self.input_text.toPlainText()
+        text = self._input_plain_text()
         if not text:
             QMessageBox.warning(self, "Warning", "Input text is empty!")
             return
         
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
         
-        self.thread = WatermarkScanThread(text)
-        self.thread.finished.connect(self.on_scan_finished)
-        self.thread.start()
+        self._pool.start(WatermarkScanTask(text, self._scan_signals))
         
     def on_scan_finished(self, stats):
         self.progress_bar.setVisible(False)
@@ -249,9 +526,14 @@ class WhitespaceCleaner(QMainWindow):
         self.stats_label.setText(self.stats_label.text().replace("?", f"{stats['invisible_chars']} | {stats['ai_likelihood']}"))
         self.status_bar.showMessage(f"Watermark scan complete: {stats['invisible_chars']} invisible chars detected")
         
-    def detect_whitespace(self):
+    def on_scan_failed(self, message):
+        self.progress_bar.setVisible(False)
+        QMessageBox.warning(self, "Error", f"Watermark scan failed: {message}")
+        
+    def detect_whitespace(self, text=None):
         """Display text with visible whitespace and basic Unicode."""
-        text = self.input_text.toPlainText()
+        if text is None:
+            text = self._input_plain_text()
         if not text:
             QMessageBox.warning(self, "Warning", "Input text is empty!")
             return
@@ -262,80 +544,108 @@ class WhitespaceCleaner(QMainWindow):
         visible_text = visible_text.replace("\n", "¶\n")
         
         # Mark invisible Unicode
-        def replace_invisible(match):
-            char = match.group()
-            if char == "\u202F":  # NNBSP
-                return "※"  # Visible marker
-            elif char in ["\u200B", "\uFEFF"]:  # Zero-width
-                return "◆"
-            return char
-        
-        visible_text = re.sub(r'[\u200B\u200C\u200D\u202F\u00A0\u2060\uFEFF\u2014\u2013]', replace_invisible, visible_text)
+        if not text.isascii():
+            visible_text = _DETECT_INVIS_RE.sub(lambda m: _DETECT_INVIS_MAP[m.group()], visible_text)
         
         self.output_text.setPlainText(visible_text)
+        if self.highlighter is None:
+            # Attaching after the text is set highlights the document in one pass
+            self.highlighter = UnicodeHighlighter(self.output_text.document())
         self.status_bar.showMessage("Whitespace and watermarks detected")
         
     def clean_whitespace(self):
         """Clean whitespace and watermarks based on options."""
-        text = self.input_text.toPlainText()
+        text = self._input_plain_text()
         if not text:
             QMessageBox.warning(self, "Warning", "Input text is empty!")
             return
         
-        original_text = text
-        
-        # Standard cleaning
-        if self.remove_spaces.isChecked():
-            text = re.sub(r'\s+', ' ', text)
-        
-        if self.remove_tabs.isChecked():
-            text = text.replace("\t", "")
-        
-        if self.replace_tabs.isChecked():
-            spaces = " " * int(self.tab_spaces.currentText())
-            text = text.replace("\t", spaces)
+        opts = CleanOpts(
+            remove_spaces=self.remove_spaces.isChecked(),
+            remove_tabs=self.remove_tabs.isChecked(),
+            replace_tabs=self.replace_tabs.isChecked(),
+            tab_width=int(self.tab_spaces.currentText()),
+            remove_newlines=self.remove_newlines.isChecked(),
+            trim_lines=self.trim_lines.isChecked(),
+            remove_invisible=self.remove_invisible.isChecked(),
+            custom_pattern=self.regex_input.text(),
+            custom_replacement=self.regex_replace.text(),
+        )
+        try:
+            cleaner = _build_cleaner(opts)
+        except re.error:
+            QMessageBox.warning(self, "Error", "Invalid regex pattern!")
+            return
         
-        if self.remove_newlines.isChecked():
-            text = re.sub(r'\n+', '\n', text)
+        if len(text) < _ASYNC_CLEAN_THRESHOLD:
+            try:
+                cleaned = cleaner(text)
+            except Exception as e:
+                QMessageBox.warning(self, "Error", f"Failed to clean text: {e}")
+                return
+            self._apply_clean(text, cleaned)
+            return
         
-        if self.trim_lines.isChecked():
-            lines = text.splitlines()
-            text = "\n".join(line.strip() for line in lines)
+        # Clean large inputs off the GUI thread so the window doesn't freeze;
+        # the input is locked so the result cannot overwrite newer edits
+        self._set_cleaning(True)
+        self._clean_source = text
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)  # Indeterminate
+        self._pool.start(CleanTask(text, cleaner, self._clean_signals))
         
-        # Invisible Unicode cleaning (watermarks)
-        if self.remove_invisible.isChecked():
-            text = re.sub(r'[\u200B\u200C\u200D\u202F\u00A0\u2060\uFEFF\u2014\u2013]', ' ', text)
+    def _set_cleaning(self, busy):
+        """Lock the input and the actions that change it while a clean runs."""
+        self.input_text.setReadOnly(busy)
+        for button in (self.clean_button, self.load_button, self.undo_button, self.redo_button, self.clear_button):
+            button.setEnabled(not busy)
         
-        # Custom regex
-        if self.regex_input.text():
-            try:
-                text = re.sub(self.regex_input.text(), self.regex_replace.text(), text)
-            except re.error:
-                QMessageBox.warning(self, "Error", "Invalid regex pattern!")
-                return
+    def on_clean_finished(self, text):
+        self.progress_bar.setVisible(False)
+        self._set_cleaning(False)
+        source, self._clean_source = self._clean_source, None
+        if self._input_plain_text() != source:
+            # The document changed underneath the clean (e.g. a load that was already running)
+            self.status_bar.showMessage("Input changed during cleaning; result discarded")
+            return
+        self._apply_clean(source, text)
         
+    def _apply_clean(self, source, text):
+        """Replace the input with cleaned text, recording source for undo."""
         # Save to history
-        self.history = self.history[:self.history_index + 1]
-        self.history.append(original_text)
-        self.history_index += 1
+        self.history.append(source)
+        self.redo_history.clear()
         
         # Update
-        self.input_text.setPlainText(text)
-        self.detect_whitespace()
+        self._replace_input_text(text)
+        self.detect_whitespace(text)
         self.update_stats()
         self.status_bar.showMessage("Whitespace and watermarks cleaned")
         
+    def on_clean_failed(self, message):
+        self.progress_bar.setVisible(False)
+        self._clean_source = None
+        self._set_cleaning(False)
+        QMessageBox.warning(self, "Error", f"Failed to clean text: {message}")
+        
     def load_file(self):
         """Load text from a file."""
         file_name, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Text Files (*.txt);;All Files (*)")
         if file_name:
-            try:
-                with open(file_name, 'r', encoding='utf-8') as file:
-                    self.input_text.setPlainText(file.read())
-                self.detect_whitespace()
-                self.status_bar.showMessage(f"Loaded: {os.path.basename(file_name)}")
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Failed to load file: {str(e)}")
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)  # Indeterminate while reading and decoding
+            self.status_bar.showMessage(f"Loading: {os.path.basename(file_name)}")
+            self._pool.start(FileLoadTask(file_name, self._load_signals))
+        
+    def on_load_finished(self, file_name, text):
+        self.progress_bar.setVisible(False)
+        self.input_text.setPlainText(text)
+        self.detect_whitespace(text)
+        self.status_bar.showMessage(f"Loaded: {os.path.basename(file_name)}")
+        
+    def on_load_failed(self, message):
+        self.progress_bar.setVisible(False)
+        QMessageBox.warning(self, "Error", f"Failed to load file: {message}")
         
     def save_file(self):
         """Save cleaned text to a file."""
@@ -343,26 +653,49 @@ class WhitespaceCleaner(QMainWindow):
         if file_name:
             try:
                 with open(file_name, 'w', encoding='utf-8') as file:
-                    file.write(self.input_text.toPlainText())
+                    file.write(self._input_plain_text())
                 self.status_bar.showMessage(f"Saved: {os.path.basename(file_name)}")
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Failed to save file: {str(e)}")
         
+    def _input_plain_text(self):
+        """Return the input text with NBSP and other invisible Unicode intact.
+        
+        QTextEdit.toPlainText() turns U+00A0 into a space, so read the raw
+        document text and apply the rest of its conversions ourselves:
+        paragraph and line separators and frame markers become newlines.
+        """
+        text = self.input_text.document().toRawText()
+        for separator in _RAW_SEPARATORS:
+            text = text.replace(separator, '\n')  # str.replace stays in C even for non-ASCII text
+        return text
+        
+    def _replace_input_text(self, text):
+        """Replace the input text without a textChanged round-trip."""
+        # Callers refresh stats themselves
+        self.input_text.blockSignals(True)
+        try:
+            self.input_text.setPlainText(text)
+        finally:
+            self.input_text.blockSignals(False)
+        
     def undo(self):
-        """Undo the last operation."""
-        if self.history_index > 0:
-            self.history_index -= 1
-            self.input_text.setPlainText(self.history[self.history_index])
-            self.detect_whitespace()
+        """Undo the last clean."""
+        if self.history:
+            self.redo_history.append(self._input_plain_text())
+            text = self.history.pop()
+            self._replace_input_text(text)
+            self.detect_whitespace(text)
             self.update_stats()
             self.status_bar.showMessage("Undo applied")
         
     def redo(self):
-        """Redo the last undone operation."""
-        if self.history_index < len(self.history) - 1:
-            self.history_index += 1
-            self.input_text.setPlainText(self.history[self.history_index])
-            self.detect_whitespace()
+        """Redo the last undone clean."""
+        if self.redo_history:
+            self.history.append(self._input_plain_text())
+            text = self.redo_history.pop()
+            self._replace_input_text(text)
+            self.detect_whitespace(text)
             self.update_stats()
             self.status_bar.showMessage("Redo applied")
         
@@ -371,8 +704,8 @@ class WhitespaceCleaner(QMainWindow):
         self.input_text.clear()
         self.output_text.clear()
         self.detailed_stats.clear()
-        self.history = []
-        self.history_index = -1
+        self.history.clear()
+        self.redo_history.clear()
         self.update_stats()
         self.status_bar.showMessage("Cleared")
 